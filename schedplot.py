@@ -8,6 +8,7 @@ from pyqtgraph.Point import Point
 import argparse
 
 from trace_events import *
+from trace_export import export_events
 
 def create_time_axis():
     """Render the time axis using correct SI prefixes"""
@@ -290,7 +291,14 @@ parser.add_argument('--show_deadlines', dest='show_deadlines',
 parser.add_argument('--modeswitch_overhead', default=None, type=int, help='Measured modeswitch overhead (in + out) in cycles')
 parser.add_argument('--logbuf_overhead', default=None, type=int, help='Measured overhead of log buffer (minus modeswitch overhead) in cycles')
 parser.add_argument('--clock_speed', default=498000000, type=int, help='CPU clock speed in Hz (498MHz [sabre] default!)')
+parser.add_argument('--export_chrome', default=None, type=str,
+        help="Stream kernel and thread slices to this Chrome/Perfetto trace-event JSON file instead of plotting")
+parser.add_argument('--export_columnar', default=None, type=str,
+        help="Stream kernel and thread slices to this columnar binary file (see trace_export.load_columnar) instead of plotting")
 
 if __name__ == '__main__':
     args = parser.parse_args()
-    start_application(args)
+    if args.export_chrome is not None or args.export_columnar is not None:
+        export_events(args)
+    else:
+        start_application(args)
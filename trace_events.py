@@ -38,15 +38,17 @@ def group_events(events):
 def print_time(t):
     return si_format(t, precision=3) + 's'
 
-def populate_events(args):
-    """Top-level parser of scheduling dumps"""
-    final_event_time = None
-    trace_events = []
-    tasks = RT_TASKS
-    basic_stats = defaultdict(float)
+def iter_trace_events(args, basic_stats=None):
+    """Parse a scheduling dump line by line, yielding kernel and thread TraceEvents as they are
+       reconstructed. Only the most recent kernel event on each core is retained, so memory use
+       does not grow with the length of the dump. Entry counts and times are accumulated into
+       basic_stats if given"""
+    if basic_stats is None:
+        basic_stats = defaultdict(float)
+    last_kernel_events = {}
     with open(args.in_filename, 'r') as f:
         first_event = None
-        for line in f.readlines():
+        for line_number, line in enumerate(f, 1):
 
             values = tuple(line.strip().split(','))
 
@@ -62,8 +64,7 @@ def populate_events(args):
                 fault = 7
                 capreg = "0"
             else:
-                print("Unknown scheduler log format")
-                return
+                raise ValueError("Unknown scheduler log format on line {}".format(line_number))
 
             # TODO: this shouldn't be necessary..
             if int(fault) >= 7:
@@ -84,9 +85,6 @@ def populate_events(args):
 
             start -= first_event
 
-            # Always update this in case it's the 'last' event
-            final_event_time = start + duration
-
             path_info = decode_kernel_path(
                     KernelEntryType(int(path)), int(path_word, 16), int(capreg, 16))
 
@@ -117,25 +115,23 @@ def populate_events(args):
 
             kernel_name = "Kernel [CPU%s]" % cpu_id
 
-            # Append the kernel event
-            trace_events.append(
-                TraceEvent(kernel_name,
-                           kernel_details,
-                           start,
-                           start + duration,
-                           int(cpu_id),
-                           exit_tcb_ident,
-                           False,
-                           path_tag))
-
-            # Possibly create a thread event if we have older kernel events on the same core
-            # TODO: what happens with sched context donation?
-            local_trace_events = filter(lambda e: e.cpu_id == int(cpu_id), trace_events)
-            local_kernel_events = list(filter(lambda e: e.name == kernel_name, local_trace_events))
-            if len(local_kernel_events) > 1:
-                last_kernel_event = local_kernel_events[-2]
-                last_event = local_kernel_events[-2]
+            kernel_event = TraceEvent(kernel_name,
+                                      kernel_details,
+                                      start,
+                                      start + duration,
+                                      int(cpu_id),
+                                      exit_tcb_ident,
+                                      False,
+                                      path_tag)
+
+            # Yield the kernel event
+            yield kernel_event
 
+            # Possibly create a thread event if we have an older kernel event on the same core
+            # TODO: what happens with sched context donation?
+            last_kernel_event = last_kernel_events.get(kernel_name)
+            last_kernel_events[kernel_name] = kernel_event
+            if last_kernel_event is not None:
                 thread_name = last_kernel_event.exit_id
                 thread_start = last_kernel_event.end_time
                 thread_stop = start # of the current kernel event
@@ -166,12 +162,11 @@ def populate_events(args):
                             actually_add_event = True
 
                 if actually_add_event:
-                    trace_events.append(
-                        TraceEvent(thread_name,
-                                   thread_details,
-                                   thread_start,
-                                   thread_stop,
-                                   None, None, fault))
+                    yield TraceEvent(thread_name,
+                                     thread_details,
+                                     thread_start,
+                                     thread_stop,
+                                     None, None, fault)
 
                     basic_stats[thread_name + '_entries'] += 1
                     basic_stats[thread_name + '_cumulative_entry_time'] \
@@ -180,6 +175,19 @@ def populate_events(args):
                         basic_stats[thread_name + '_cumulative_entry_time'] / \
                             basic_stats[thread_name + '_entries']
 
+def populate_events(args):
+    """Top-level parser of scheduling dumps"""
+    final_event_time = None
+    trace_events = []
+    tasks = RT_TASKS
+    basic_stats = defaultdict(float)
+    for event in iter_trace_events(args, basic_stats):
+        trace_events.append(event)
+
+        # Always update this in case it's the 'last' event
+        if event.cpu_id is not None:
+            final_event_time = event.end_time
+
     keys = list(basic_stats.keys())
     total_utilization = 0.0
     total_entry_time = 0.0
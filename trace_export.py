@@ -0,0 +1,212 @@
+import json
+import struct
+import numpy as np
+
+from trace_events import *
+
+# Number of slices buffered before each write to the output file
+EXPORT_CHUNK_SIZE = 65536
+
+# Chrome trace-event processes used to separate kernel and thread tracks
+KERNEL_PID = 0
+THREAD_PID = 1
+
+# Columnar file layout: header magic, row groups of columns, JSON footer with string tables
+COLUMNAR_MAGIC = b'SCHEDCOL'
+COLUMNAR_VERSION = 1
+COLUMNAR_COLUMNS = [
+    ('start_time', np.float64),
+    ('end_time', np.float64),
+    ('name_id', np.uint32),
+    ('exit_id', np.int32),
+    ('cpu_id', np.int16),
+    ('fault', np.uint8),
+    ('tag_id', np.int32),
+    ]
+
+class ChromeTraceWriter(object):
+    """Streams slices to a Chrome/Perfetto trace-event JSON file (openable in ui.perfetto.dev
+       or chrome://tracing). Kernel slices get one track per CPU, threads one track each"""
+
+    def __init__(self, f, chunk_size=EXPORT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.first_write = True
+        self.kernel_names = set()
+        self.thread_tids = {}
+
+        self.f.write('{"displayTimeUnit": "ns", "traceEvents": [\n')
+        self.add_metadata('process_name', KERNEL_PID, 0, 'Kernel')
+        self.add_metadata('process_name', THREAD_PID, 0, 'Threads')
+
+    def add_metadata(self, kind, pid, tid, name):
+        self.pending.append({'ph': 'M', 'name': kind, 'pid': pid, 'tid': tid,
+                             'args': {'name': name}})
+
+    def get_track(self, event):
+        """Map an event onto a (pid, tid) pair, announcing new tracks as they appear"""
+        if event.cpu_id is not None:
+            if event.name not in self.kernel_names:
+                self.kernel_names.add(event.name)
+                self.add_metadata('thread_name', KERNEL_PID, event.cpu_id, event.name)
+            return (KERNEL_PID, event.cpu_id)
+
+        if event.name not in self.thread_tids:
+            self.thread_tids[event.name] = len(self.thread_tids)
+            self.add_metadata('thread_name', THREAD_PID, self.thread_tids[event.name], event.name)
+        return (THREAD_PID, self.thread_tids[event.name])
+
+    def add(self, event):
+        (pid, tid) = self.get_track(event)
+        # Trace-event timestamps are in microseconds
+        slice_args = {}
+        if event.tag is not None:
+            slice_args['tag'] = event.tag
+        if event.exit_id is not None:
+            slice_args['exit_to'] = event.exit_id
+        if event.fault:
+            slice_args['fault'] = True
+        self.pending.append({'ph': 'X', 'name': event.name, 'pid': pid, 'tid': tid,
+                             'ts': event.start_time * 1e6,
+                             'dur': (event.end_time - event.start_time) * 1e6,
+                             'args': slice_args})
+        if len(self.pending) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+        chunk = ',\n'.join(json.dumps(e) for e in self.pending)
+        if not self.first_write:
+            chunk = ',\n' + chunk
+        self.f.write(chunk)
+        self.first_write = False
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.f.write('\n]}\n')
+
+class ColumnarWriter(object):
+    """Streams slices to a compact binary file as row groups of contiguous little-endian
+       columns. Event names, exit threads and tags are interned into string tables stored in a
+       JSON footer. Use load_columnar() to read it back as NumPy arrays"""
+
+    def __init__(self, f, chunk_size=EXPORT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.columns = {name: [] for (name, _) in COLUMNAR_COLUMNS}
+        self.names = {}
+        self.exits = {}
+        self.tags = {}
+        self.n_rows = 0
+
+        self.f.write(COLUMNAR_MAGIC)
+        self.f.write(struct.pack('<I', COLUMNAR_VERSION))
+
+    def intern(self, table, value):
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def add(self, event):
+        self.columns['start_time'].append(event.start_time)
+        self.columns['end_time'].append(event.end_time)
+        self.columns['name_id'].append(self.intern(self.names, event.name))
+        self.columns['exit_id'].append(-1 if event.exit_id is None else self.intern(self.exits, event.exit_id))
+        self.columns['cpu_id'].append(-1 if event.cpu_id is None else event.cpu_id)
+        self.columns['fault'].append(1 if event.fault else 0)
+        self.columns['tag_id'].append(-1 if event.tag is None else self.intern(self.tags, event.tag))
+        if len(self.columns['start_time']) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        n_rows = len(self.columns['start_time'])
+        if n_rows == 0:
+            return
+        # Row group: row count, then each column stored contiguously
+        self.f.write(struct.pack('<Q', n_rows))
+        for (name, dtype) in COLUMNAR_COLUMNS:
+            column = np.asarray(self.columns[name], dtype=np.dtype(dtype).newbyteorder('<'))
+            self.f.write(column.tobytes())
+            self.columns[name] = []
+        self.n_rows += n_rows
+
+    def close(self):
+        self.flush()
+        # A zero row count terminates the row groups
+        self.f.write(struct.pack('<Q', 0))
+        footer = json.dumps({
+            'columns': [(name, np.dtype(dtype).str) for (name, dtype) in COLUMNAR_COLUMNS],
+            'names': sorted(self.names, key=self.names.get),
+            'exits': sorted(self.exits, key=self.exits.get),
+            'tags': sorted(self.tags, key=self.tags.get),
+            'n_rows': self.n_rows,
+            }).encode('utf-8')
+        self.f.write(footer)
+
+def load_columnar(filename):
+    """Read a file written by ColumnarWriter, returning (columns, names, exits, tags) where
+       columns is a dictionary of NumPy arrays and name_id/exit_id/tag_id index into
+       names/exits/tags"""
+    with open(filename, 'rb') as f:
+        if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError("Not a schedplot columnar file")
+        (version,) = struct.unpack('<I', f.read(4))
+        if version != COLUMNAR_VERSION:
+            raise ValueError("Unsupported columnar file version {}".format(version))
+
+        def read_exactly(n_bytes):
+            data = f.read(n_bytes)
+            if len(data) != n_bytes:
+                raise ValueError("Truncated columnar file")
+            return data
+
+        groups = {name: [] for (name, _) in COLUMNAR_COLUMNS}
+        while True:
+            (n_rows,) = struct.unpack('<Q', read_exactly(8))
+            if n_rows == 0:
+                break
+            for (name, dtype) in COLUMNAR_COLUMNS:
+                dtype = np.dtype(dtype).newbyteorder('<')
+                groups[name].append(np.frombuffer(read_exactly(n_rows * dtype.itemsize), dtype=dtype))
+
+        footer = json.loads(f.read().decode('utf-8'))
+
+    columns = {}
+    for (name, dtype) in COLUMNAR_COLUMNS:
+        if len(groups[name]) > 0:
+            columns[name] = np.concatenate(groups[name])
+        else:
+            columns[name] = np.zeros(0, dtype=dtype)
+        if len(columns[name]) != footer['n_rows']:
+            raise ValueError("Columnar file has {} rows in '{}', footer expects {}".format(
+                len(columns[name]), name, footer['n_rows']))
+    return (columns, footer['names'], footer['exits'], footer['tags'])
+
+def export_events(args):
+    """Stream every reconstructed kernel and thread slice to the requested export files
+       without holding the whole trace in memory"""
+    writers = []
+    files = []
+    if args.export_chrome is not None:
+        files.append(open(args.export_chrome, 'w'))
+        writers.append(ChromeTraceWriter(files[-1]))
+    if args.export_columnar is not None:
+        files.append(open(args.export_columnar, 'wb'))
+        writers.append(ColumnarWriter(files[-1]))
+
+    n_events = 0
+    try:
+        for event in iter_trace_events(args):
+            for writer in writers:
+                writer.add(event)
+            n_events += 1
+        for writer in writers:
+            writer.close()
+    finally:
+        for f in files:
+            f.close()
+
+    print("exported_events = {}".format(n_events))